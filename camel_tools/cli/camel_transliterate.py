@@ -57,6 +57,7 @@ Options:
 
 from __future__ import print_function, absolute_import
 
+import io
 import sys
 
 from docopt import docopt
@@ -94,6 +95,10 @@ _BUILTIN_SCHEMES = [
     ('hsb2xmlbw', 'Habash-Soudi-Buckwalter to Habash-Soudi-Buckwalter'),
 ]
 
+# Input is read and transliterated in blocks of this many characters rather
+# than line by line
+_BLOCK_SIZE = 1024 * 1024
+
 
 def _open_files(finpath, foutpath):
     if finpath is None:
@@ -121,6 +126,54 @@ def _open_files(finpath, foutpath):
     return fin, fout
 
 
+def _write(fout, s):
+    if six.PY3:
+        fout.write(s)
+    else:
+        fout.write(force_encoding(s))
+
+
+def _transliterate_block(trans, marker, block, strip_markers, ignore_markers):
+    if marker not in block:
+        return trans.transliterate(block, strip_markers, ignore_markers)
+
+    # A marker at the start of a line is treated differently by
+    # Transliterator depending on whether the line starts the string, so
+    # blocks with markers are transliterated line by line to match the output
+    # of transliterating each line on its own.
+    return u''.join([trans.transliterate(line, strip_markers, ignore_markers)
+                     for line in io.StringIO(block)])
+
+
+def _transliterate_file(trans, marker, fin, fout, strip_markers,
+                        ignore_markers):
+    leftover = u''
+
+    while True:
+        block = fin.read(_BLOCK_SIZE)
+
+        if not block:
+            break
+
+        block = leftover + force_unicode(block)
+
+        # Only complete lines are transliterated, the trailing partial line is
+        # carried over to the next block
+        last_newline = block.rfind(u'\n')
+        if last_newline == -1:
+            leftover = block
+            continue
+
+        leftover = block[last_newline + 1:]
+        _write(fout, _transliterate_block(trans, marker,
+                                          block[:last_newline + 1],
+                                          strip_markers, ignore_markers))
+
+    if leftover:
+        _write(fout, _transliterate_block(trans, marker, leftover,
+                                          strip_markers, ignore_markers))
+
+
 def main():  # pragma: no cover
     try:
         version = ('CAMeL Tools v{}'.format(__version__))
@@ -161,18 +214,8 @@ def main():  # pragma: no cover
 
             # Transliterate lines
             try:
-                for line in fin:
-                    line = force_unicode(line)
-
-                    if six.PY3:
-                        fout.write(
-                            trans.transliterate(line, strip_markers,
-                                                ignore_markers))
-                    else:
-                        fout.write(
-                            force_encoding(
-                                trans.transliterate(line, strip_markers,
-                                                    ignore_markers)))
+                _transliterate_file(trans, marker, fin, fout, strip_markers,
+                                    ignore_markers)
                 fout.flush()
 
             # If everything worked so far, this shouldn't happen
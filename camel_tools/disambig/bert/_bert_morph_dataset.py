@@ -27,6 +27,11 @@ import torch.nn as nn
 from torch.utils.data import Dataset
 
 
+# Cross entropy's ignore_index is used as the padding label id so that only
+# real label ids contribute to the loss later.
+_PAD_LABEL_ID = nn.CrossEntropyLoss().ignore_index
+
+
 def _prepare_sentences(sentences, placeholder=''):
     """
     Encapsulates the input sentences into PrepSentence
@@ -84,9 +89,7 @@ class MorphDataset(Dataset):
     def __init__(self, sentences, tokenizer, labels, max_seq_length):
         prepared_sentences = _prepare_sentences(sentences,
                                                 placeholder=labels[0])
-        # Use cross entropy ignore_index as padding label id so that only
-        # real label ids contribute to the loss later.
-        self.pad_token_label_id = nn.CrossEntropyLoss().ignore_index
+        self.pad_token_label_id = _PAD_LABEL_ID
         self.features = self._featurize_input(
             prepared_sentences,
             labels,
@@ -135,12 +138,19 @@ class MorphDataset(Dataset):
         label_map = {label: i for i, label in enumerate(label_list)}
         features = []
 
+        # Common words show up over and over across sentences, so each
+        # distinct word is only tokenized once
+        word_tokens_cache = {}
+
         for sent_id, sentence in enumerate(prepared_sentences):
             tokens = []
             label_ids = []
 
             for word, label in zip(sentence.words, sentence.labels):
-                word_tokens = tokenizer.tokenize(word)
+                word_tokens = word_tokens_cache.get(word, None)
+                if word_tokens is None:
+                    word_tokens = tokenizer.tokenize(word)
+                    word_tokens_cache[word] = word_tokens
                 # bert-base-multilingual-cased sometimes output "nothing ([])
                 # when calling tokenize with just a space.
                 if len(word_tokens) > 0:
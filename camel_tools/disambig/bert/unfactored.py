@@ -28,9 +28,7 @@ from pathlib import Path
 import pickle
 
 from cachetools import LFUCache
-import numpy as np
 import torch
-import torch.nn as nn
 from torch.utils.data import DataLoader
 from transformers import BertForTokenClassification, BertTokenizer
 
@@ -40,9 +38,11 @@ from camel_tools.morphology.analyzer import Analyzer
 from camel_tools.disambig.common import Disambiguator, DisambiguatedWord
 from camel_tools.disambig.common import ScoredAnalysis
 from camel_tools.disambig.bert._bert_morph_dataset import MorphDataset
+from camel_tools.disambig.bert._bert_morph_dataset import _PAD_LABEL_ID
 from camel_tools.disambig.score_function import score_analysis_uniform
 from camel_tools.disambig.score_function import FEATURE_SET_MAP
 from camel_tools.utils.dediac import dediac_ar
+from camel_tools.utils._bert import label_array
 
 
 _SCORING_FUNCTION_MAP = {
@@ -79,6 +79,7 @@ class _BERTFeatureTagger:
         self._model = BertForTokenClassification.from_pretrained(model_path)
         self._tokenizer = BertTokenizer.from_pretrained(model_path)
         self._labels_map = self._model.config.id2label
+        self._label_arr = label_array(self._labels_map)
         self._use_gpu = use_gpu
 
     def labels(self):
@@ -95,7 +96,8 @@ class _BERTFeatureTagger:
         care of getting rid of the padding token.
 
         Args:
-            predictions (:obj:`np.ndarray`): The predictions of the model
+            predictions (:obj:`np.ndarray`): The predicted label ids of the
+                model.
             label_ids (:obj:`np.ndarray`): The label ids of the inputs.
                 They will always be the ids of Os since we're dealing with a
                 test dataset. Note that label_ids are also padded.
@@ -106,14 +108,9 @@ class _BERTFeatureTagger:
             all the sentences in the batch
         """
 
-        preds = np.argmax(predictions, axis=2)
-        batch_size, seq_len = preds.shape
-        preds_list = [[] for _ in range(batch_size)]
-
-        for i in range(batch_size):
-            for j in range(seq_len):
-                if label_ids[i, j] != nn.CrossEntropyLoss().ignore_index:
-                    preds_list[i].append(self._labels_map[preds[i][j]])
+        valid_mask = label_ids != _PAD_LABEL_ID
+        preds_list = [self._label_arr[row_preds[row_mask]].tolist()
+                      for row_preds, row_mask in zip(predictions, valid_mask)]
 
         # Collating the predicted labels based on the sentence ids
         final_preds_list = [[] for _ in range(len(set(sent_ids)))]
@@ -170,7 +167,9 @@ class _BERTFeatureTagger:
                 label_ids = batch['label_ids']
                 sent_ids = batch['sent_id']
                 logits = self._model(**inputs)[0]
-                preds = logits
+                # Only the predicted label ids are copied back from the
+                # device rather than the logits of every label
+                preds = torch.argmax(logits, dim=-1)
                 prediction = self._align_predictions(preds.cpu().numpy(),
                                                      label_ids.cpu().numpy(),
                                                      sent_ids.cpu().numpy())
@@ -30,9 +30,10 @@ from __future__ import absolute_import
 from collections import namedtuple
 from pathlib import Path
 import re
+from threading import Lock
+from weakref import WeakValueDictionary
 
-from camel_tools.utils.stringutils import force_unicode
-from camel_tools.morphology.utils import strip_lex
+from camel_tools.morphology.utils import get_merge_feats, strip_lex
 from camel_tools.morphology.errors import InvalidDatabaseFlagError
 from camel_tools.morphology.errors import DatabaseParseError
 from camel_tools.data import CATALOGUE
@@ -41,6 +42,65 @@ from camel_tools.data import CATALOGUE
 MorphologyDBFlags = namedtuple('MorphologyDBFlags', ['analysis', 'generation',
                                                      'reinflection'])
 
+_SECTION_HEADERS = ('###DEFINES###', '###DEFAULTS###', '###ORDER###',
+                    '###TOKENIZATIONS###', '###STEMBACKOFF###',
+                    '###PREFIXES###', '###SUFFIXES###', '###STEMS###',
+                    '###TABLE AB###', '###TABLE BC###', '###TABLE AC###')
+_SECTION_INDEX = dict((h, i) for i, h in enumerate(_SECTION_HEADERS))
+
+# Builtin databases that are still in use, keyed on (path, flags). Entries are
+# dropped once nothing else references the database.
+_BUILTIN_DB_CACHE = WeakValueDictionary()
+_BUILTIN_DB_CACHE_LOCK = Lock()
+
+
+def _iter_db_sections(contents):
+    """Split the contents of a DB file into sections, yielding the section
+    index and lines of each one. Text before the first header belongs to the
+    DEFINES section, whose header is optional. All other sections must appear
+    exactly once and in order.
+    """
+
+    # Pad with newlines so that every section body starts with one
+    contents = u'\n' + contents.rstrip(u'\n') + u'\n'
+
+    section = 0
+    body_start = 0
+    search_pos = 0
+
+    while True:
+        header_start = contents.find(u'\n###', search_pos)
+        if header_start == -1:
+            break
+
+        header_end = contents.find(u'\n', header_start + 1)
+        search_pos = header_end
+        next_section = _SECTION_INDEX.get(
+            contents[header_start + 1:header_end].rstrip(), None)
+
+        if next_section is None:
+            continue
+
+        # The DEFINES header may only start the file
+        if next_section == 0 and header_start == 0:
+            body_start = header_end
+            continue
+
+        if next_section != section + 1:
+            raise DatabaseParseError('unexpected section header {}'.format(
+                repr(_SECTION_HEADERS[next_section])))
+
+        yield section, contents[body_start:header_start].split(u'\n')[1:]
+
+        section = next_section
+        body_start = header_end
+
+    if section != len(_SECTION_HEADERS) - 1:
+        raise DatabaseParseError('missing section header {}'.format(
+            repr(_SECTION_HEADERS[section + 1])))
+
+    yield section, contents[body_start:-1].split(u'\n')[1:]
+
 
 class MorphologyDB:
     """Class providing indexes from a given morphology database file.
@@ -85,14 +145,28 @@ class MorphologyDB:
 
         Returns:
             :obj:`MorphologyDB`: Instance of builtin database with given flags.
+            Databases are only loaded once per process, so calls with the
+            same **db_name** and **flags** return the same instance for as
+            long as it is in use. That instance is shared with every other
+            caller and must not be modified. Create a :obj:`MorphologyDB`
+            directly from the database file if you need a private copy.
         """
 
         if db_name is None:
             db_name = CATALOGUE.components['MorphologyDB'].default
 
         db_info = CATALOGUE.components['MorphologyDB'].datasets[db_name]
+        db_path = str(Path(db_info.path, 'morphology.db'))
+        cache_key = (db_path, ''.join(sorted(set(flags))))
+
+        with _BUILTIN_DB_CACHE_LOCK:
+            db = _BUILTIN_DB_CACHE.get(cache_key, None)
 
-        return MorphologyDB(str(Path(db_info.path, 'morphology.db')), flags)
+            if db is None:
+                db = MorphologyDB(db_path, flags)
+                _BUILTIN_DB_CACHE[cache_key] = db
+
+        return db
 
     def __init__(self, fpath, flags='a'):
         """Class constructor.
@@ -124,7 +198,7 @@ class MorphologyDB:
         self.defines = {}
         self.defaults = {}
         self.order = None
-        self.tokenizations = set()
+        self.tokenizations = frozenset()
         self.compute_feats = frozenset()
         self.stem_backoffs = {}
 
@@ -145,6 +219,9 @@ class MorphologyDB:
 
         self._parse_dbfile(fpath)
 
+        # Features merge_features has to handle, resolved once for this DB
+        self.merge_feats = get_merge_feats(self.defines)
+
     def _parse_analysis_line_toks(self, toks):
         res = {}
 
@@ -152,12 +229,13 @@ class MorphologyDB:
             if len(tok) == 0:
                 continue
 
-            subtoks = tok.split(u':')
-            if len(subtoks) < 2:
+            # Values may themselves contain ':', so only split on the first
+            feat, sep, val = tok.partition(u':')
+            if not sep:
                 raise DatabaseParseError(
                     'invalid key value pair {}'.format(repr(tok)))
 
-            res[subtoks[0]] = u':'.join(subtoks[1:])
+            res[feat] = val
 
         return res
 
@@ -165,15 +243,12 @@ class MorphologyDB:
         res = {}
 
         for tok in toks:
-            subtoks = tok.split(u':')
-            if len(subtoks) < 2:
+            feat, sep, val = tok.partition(u':')
+            if not sep:
                 raise DatabaseParseError(
                     'invalid key value pair {} in DEFAULTS'.format(
                         repr(tok)))
 
-            feat = subtoks[0]
-            val = ':'.join(subtoks[1:])
-
             if val == '*':
                 res[feat] = None
             else:
@@ -181,285 +256,267 @@ class MorphologyDB:
 
         return res
 
-    def _parse_dbfile(self, fpath):
-        with open(fpath, 'r', encoding='utf-8') as dbfile:
-            # Process DEFINES
-            for line in dbfile:
-                line = line = force_unicode(line).strip()
+    def _parse_defines(self, lines):
+        for line in lines:
+            line = line.strip()
+            toks = line.split(u' ')
 
-                if line == '###DEFINES###':
-                    continue
+            # Check if line has the minimum viable format
+            if len(toks) < 3 or toks[0] != 'DEFINE':
+                raise DatabaseParseError(
+                    'invalid DEFINES line {}'.format(repr(line)))
 
-                if line == '###DEFAULTS###':
-                    break
+            new_define = toks[1]
+            val_set = set()
 
-                toks = line.split(u' ')
+            # Parse values for defined keyword
+            for tok in toks[2:]:
+                subtoks = tok.split(':')
 
-                # Check if line has the minimum viable format
-                if len(toks) < 3 or toks[0] != 'DEFINE':
+                # If it's a malformed entry, ignore it
+                if len(subtoks) != 2 and subtoks[0] != toks[1]:
                     raise DatabaseParseError(
-                        'invalid DEFINES line {}'.format(repr(line)))
-
-                new_define = toks[1]
-                val_set = set()
-
-                # Parse values for defined keyword
-                for tok in toks[2:]:
-                    subtoks = tok.split(':')
-
-                    # If it's a malformed entry, ignore it
-                    if len(subtoks) != 2 and subtoks[0] != toks[1]:
-                        raise DatabaseParseError(
-                            'invalid key value pair {} in DEFINES'.format(
-                                repr(tok)))
-
-                    # If it's an open class, we use None instead of a set
-                    if len(toks) == 3 and subtoks[1] == '*open*':
-                        val_set = None
-                        break
-
-                    val_set.add(subtoks[1])
+                        'invalid key value pair {} in DEFINES'.format(
+                            repr(tok)))
 
-                self.defines[new_define] = (
-                    list(val_set) if val_set is not None else None)
-
-            # Process DEFAULTS
-            for line in dbfile:
-                line = force_unicode(line).strip()
-
-                if line == '###ORDER###':
+                # If it's an open class, we use None instead of a set
+                if len(toks) == 3 and subtoks[1] == '*open*':
+                    val_set = None
                     break
 
-                toks = line.split(u' ')
-
-                if len(toks) < 2 or toks[0] != 'DEFAULT':
-                    raise DatabaseParseError(
-                        'invalid DEFAULTS line {}'.format(repr(line)))
-
-                parsed_default = self._parse_defaults_line_toks(toks[1:])
-
-                if self._defaultKey not in parsed_default:
-                    raise DatabaseParseError(
-                        'DEFAULTS line {} missing {} value'.format(
-                            repr(line), self._defaultKey))
-
-                dkey = parsed_default[self._defaultKey]
-                self.defaults[dkey] = parsed_default
-
-            # Process ORDER
-            for line in dbfile:
-                line = force_unicode(line).strip()
+                val_set.add(subtoks[1])
 
-                if line == '###TOKENIZATIONS###':
-                    self.compute_feats = frozenset(self.order)
-                    break
-
-                toks = line.split(u' ')
+            self.defines[new_define] = (
+                frozenset(val_set) if val_set is not None else None)
 
-                if (self.order is not None and len(toks) < 2 and
-                        toks[0] != 'ORDER'):
-                    raise DatabaseParseError(
-                        'invalid ORDER line {}'.format(repr(line)))
+    def _parse_defaults(self, lines):
+        for line in lines:
+            line = line.strip()
+            toks = line.split(u' ')
 
-                if toks[1] not in self.defines:
-                    raise DatabaseParseError(
-                        'invalid feature {} in ORDER line.'.format(
-                            repr(toks[1])))
+            if len(toks) < 2 or toks[0] != 'DEFAULT':
+                raise DatabaseParseError(
+                    'invalid DEFAULTS line {}'.format(repr(line)))
 
-                self.order = toks[1:]
+            parsed_default = self._parse_defaults_line_toks(toks[1:])
 
-            # Process TOKENIZATIONS
-            for line in dbfile:
-                line = force_unicode(line).strip()
+            if self._defaultKey not in parsed_default:
+                raise DatabaseParseError(
+                    'DEFAULTS line {} missing {} value'.format(
+                        repr(line), self._defaultKey))
 
-                if line == '###STEMBACKOFF###':
-                    self.tokenizations = frozenset(self.tokenizations)
-                    break
+            dkey = parsed_default[self._defaultKey]
+            self.defaults[dkey] = parsed_default
 
-                toks = line.split(u' ')
+    def _parse_order(self, lines):
+        order = None
 
-                if (self.order is not None and len(toks) < 2 and
-                        toks[0] != 'TOKENIZATION'):
-                    raise DatabaseParseError(
-                        'invalid TOKENIZATION line {}'.format(repr(line)))
+        for line in lines:
+            line = line.strip()
+            toks = line.split(u' ')
 
-                if toks[1] not in self.defines:
-                    raise DatabaseParseError(
-                        'invalid feature {} in TOKENIZATION line.'.format(
-                            repr(toks[1])))
+            if (order is not None and len(toks) < 2 and
+                    toks[0] != 'ORDER'):
+                raise DatabaseParseError(
+                    'invalid ORDER line {}'.format(repr(line)))
 
-                self.tokenizations.update(toks[1:])
+            if toks[1] not in self.defines:
+                raise DatabaseParseError(
+                    'invalid feature {} in ORDER line.'.format(
+                        repr(toks[1])))
 
-            # Process STEMBACKOFFS
-            for line in dbfile:
-                line = force_unicode(line).strip()
+            order = toks[1:]
 
-                if line == '###PREFIXES###':
-                    break
+        self.order = order
+        self.compute_feats = frozenset(order)
 
-                toks = line.split(u' ')
+    def _parse_tokenizations(self, lines):
+        tokenizations = set()
 
-                if len(toks) < 3 or toks[0] != 'STEMBACKOFF':
-                    raise DatabaseParseError(
-                        'invalid STEMBACKOFFS line {}'.format(repr(line)))
+        for line in lines:
+            line = line.strip()
+            toks = line.split(u' ')
 
-                self.stem_backoffs[toks[1]] = toks[2:]
+            if (self.order is not None and len(toks) < 2 and
+                    toks[0] != 'TOKENIZATION'):
+                raise DatabaseParseError(
+                    'invalid TOKENIZATION line {}'.format(repr(line)))
 
-            # Process PREFIXES
-            for line in dbfile:
-                line = force_unicode(line)
-                parts = line.split(u'\t')
+            if toks[1] not in self.defines:
+                raise DatabaseParseError(
+                    'invalid feature {} in TOKENIZATION line.'.format(
+                        repr(toks[1])))
 
-                if len(parts) != 3:
-                    if line.strip() == '###SUFFIXES###':
-                        break
-                    raise DatabaseParseError(
-                        'invalid PREFIXES line {}'.format(repr(line)))
-
-                prefix = parts[0].strip()
-                category = parts[1]
-                analysis = self._parse_analysis_line_toks(
-                    parts[2].strip().split(u' '))
-
-                if self._withAnalysis:
-                    if prefix not in self.prefix_hash:
-                        self.prefix_hash[prefix] = []
-                    self.prefix_hash[prefix].append((category, analysis))
-
-                if self._withGeneration:
-                    # FIXME: Make sure analyses for category are unique?
-                    if category not in self.prefix_cat_hash:
-                        self.prefix_cat_hash[category] = []
-                    self.prefix_cat_hash[category].append(analysis)
-
-            # Process SUFFIXES
-            for line in dbfile:
-                line = force_unicode(line)
-                parts = line.split(u'\t')
-
-                if len(parts) != 3:
-                    if line.strip() == '###STEMS###':
-                        break
-                    raise DatabaseParseError(
-                        'invalid SUFFIXES line {}'.format(repr(line)))
+            tokenizations.update(toks[1:])
 
-                suffix = parts[0].strip()
-                category = parts[1]
-                analysis = self._parse_analysis_line_toks(
-                    parts[2].strip().split(u' '))
+        self.tokenizations = frozenset(tokenizations)
 
-                if self._withAnalysis:
-                    if suffix not in self.suffix_hash:
-                        self.suffix_hash[suffix] = []
-                    self.suffix_hash[suffix].append((category, analysis))
+    def _parse_stem_backoffs(self, lines):
+        for line in lines:
+            line = line.strip()
+            toks = line.split(u' ')
 
-                if self._withGeneration:
-                    # FIXME: Make sure analyses for category are unique?
-                    if category not in self.suffix_cat_hash:
-                        self.suffix_cat_hash[category] = []
-                    self.suffix_cat_hash[category].append(analysis)
+            if len(toks) < 3 or toks[0] != 'STEMBACKOFF':
+                raise DatabaseParseError(
+                    'invalid STEMBACKOFFS line {}'.format(repr(line)))
 
-            # Process STEMS
-            for line in dbfile:
-                line = force_unicode(line).strip()
+            self.stem_backoffs[toks[1]] = toks[2:]
 
-                if line == '###TABLE AB###':
-                    break
+    def _parse_prefixes(self, lines):
+        for line in lines:
+            parts = line.split(u'\t')
 
-                parts = line.split(u'\t')
+            if len(parts) != 3:
+                raise DatabaseParseError(
+                    'invalid PREFIXES line {}'.format(repr(line)))
 
-                if len(parts) != 3:
-                    raise DatabaseParseError(
-                        'invalid STEMS line {}'.format(repr(line)))
-
-                stem = parts[0]
-                category = parts[1]
-                analysis = self._parse_analysis_line_toks(parts[2].split(u' '))
-                analysis['lex'] = strip_lex(analysis['lex'])
-
-                if self._withAnalysis:
-                    if stem not in self.stem_hash:
-                        self.stem_hash[stem] = []
-                    self.stem_hash[stem].append((category, analysis))
-
-                if self._withGeneration:
-                    # FIXME: Make sure analyses for category are unique?
-                    lemma_key = analysis['lex']
-                    analysis['stemcat'] = category
-                    if lemma_key not in self.lemma_hash:
-                        self.lemma_hash[lemma_key] = []
-                    self.lemma_hash[lemma_key].append(analysis)
-
-            # Process prefix_stem compatibility table
-            for line in dbfile:
-                line = force_unicode(line).strip()
-
-                if line == '###TABLE BC###':
-                    break
+            prefix = parts[0].strip()
+            category = parts[1]
+            analysis = self._parse_analysis_line_toks(
+                parts[2].strip().split(u' '))
 
-                toks = line.split()
+            if self._withAnalysis:
+                if prefix not in self.prefix_hash:
+                    self.prefix_hash[prefix] = []
+                    if len(prefix) > self.max_prefix_size:
+                        self.max_prefix_size = len(prefix)
+                self.prefix_hash[prefix].append((category, analysis))
+
+            if self._withGeneration:
+                # FIXME: Make sure analyses for category are unique?
+                if category not in self.prefix_cat_hash:
+                    self.prefix_cat_hash[category] = []
+                self.prefix_cat_hash[category].append(analysis)
+
+    def _parse_suffixes(self, lines):
+        for line in lines:
+            parts = line.split(u'\t')
+
+            if len(parts) != 3:
+                raise DatabaseParseError(
+                    'invalid SUFFIXES line {}'.format(repr(line)))
 
-                if len(toks) != 2:
-                    raise DatabaseParseError(
-                        'invalid TABLE AB line {}'.format(repr(line)))
+            suffix = parts[0].strip()
+            category = parts[1]
+            analysis = self._parse_analysis_line_toks(
+                parts[2].strip().split(u' '))
 
-                prefix_cat = toks[0]
-                stem_cat = toks[1]
+            if self._withAnalysis:
+                if suffix not in self.suffix_hash:
+                    self.suffix_hash[suffix] = []
+                    if len(suffix) > self.max_suffix_size:
+                        self.max_suffix_size = len(suffix)
+                self.suffix_hash[suffix].append((category, analysis))
+
+            if self._withGeneration:
+                # FIXME: Make sure analyses for category are unique?
+                if category not in self.suffix_cat_hash:
+                    self.suffix_cat_hash[category] = []
+                self.suffix_cat_hash[category].append(analysis)
+
+    def _parse_stems(self, lines):
+        for line in lines:
+            line = line.strip()
+            parts = line.split(u'\t')
+
+            if len(parts) != 3:
+                raise DatabaseParseError(
+                    'invalid STEMS line {}'.format(repr(line)))
 
-                if self._withAnalysis:
-                    if prefix_cat not in self.prefix_stem_compat:
-                        self.prefix_stem_compat[prefix_cat] = set()
-                    self.prefix_stem_compat[prefix_cat].add(stem_cat)
+            stem = parts[0]
+            category = parts[1]
+            analysis = self._parse_analysis_line_toks(parts[2].split(u' '))
+            analysis['lex'] = strip_lex(analysis['lex'])
+            analysis['stemcat'] = category
 
-                if self._withGeneration:
-                    if stem_cat not in self.stem_prefix_compat:
-                        self.stem_prefix_compat[stem_cat] = set()
-                    self.stem_prefix_compat[stem_cat].add(prefix_cat)
+            # The same analysis object is shared by stem_hash and
+            # lemma_hash.
+            if self._withAnalysis:
+                if stem not in self.stem_hash:
+                    self.stem_hash[stem] = []
+                self.stem_hash[stem].append((category, analysis))
+
+            if self._withGeneration:
+                # FIXME: Make sure analyses for category are unique?
+                lemma_key = analysis['lex']
+                if lemma_key not in self.lemma_hash:
+                    self.lemma_hash[lemma_key] = []
+                self.lemma_hash[lemma_key].append(analysis)
+
+    def _parse_table_ab(self, lines):
+        # Process prefix_stem compatibility table
+        for line in lines:
+            toks = line.split()
+
+            if len(toks) != 2:
+                raise DatabaseParseError(
+                    'invalid TABLE AB line {}'.format(repr(line.strip())))
 
-            # Process stem_suffix compatibility table
-            for line in dbfile:
-                line = force_unicode(line).strip()
+            prefix_cat = toks[0]
+            stem_cat = toks[1]
 
-                if line == '###TABLE AC###':
-                    break
+            if self._withAnalysis:
+                if prefix_cat not in self.prefix_stem_compat:
+                    self.prefix_stem_compat[prefix_cat] = set()
+                self.prefix_stem_compat[prefix_cat].add(stem_cat)
 
-                toks = line.split()
+            if self._withGeneration:
+                if stem_cat not in self.stem_prefix_compat:
+                    self.stem_prefix_compat[stem_cat] = set()
+                self.stem_prefix_compat[stem_cat].add(prefix_cat)
 
-                if len(toks) != 2:
-                    raise DatabaseParseError(
-                        'invalid TABLE BC line {}'.format(repr(line)))
+    def _parse_table_bc(self, lines):
+        # Process stem_suffix compatibility table
+        for line in lines:
+            toks = line.split()
 
-                stem_cat = toks[0]
-                suffix_cat = toks[1]
+            if len(toks) != 2:
+                raise DatabaseParseError(
+                    'invalid TABLE BC line {}'.format(repr(line.strip())))
 
-                if stem_cat not in self.stem_suffix_compat:
-                    self.stem_suffix_compat[stem_cat] = set()
-                self.stem_suffix_compat[stem_cat].add(suffix_cat)
+            stem_cat = toks[0]
+            suffix_cat = toks[1]
 
-            # Process prefix_suffix compatibility table
-            for line in dbfile:
-                line = force_unicode(line).strip()
+            if stem_cat not in self.stem_suffix_compat:
+                self.stem_suffix_compat[stem_cat] = set()
+            self.stem_suffix_compat[stem_cat].add(suffix_cat)
 
-                toks = line.split()
+    def _parse_table_ac(self, lines):
+        # Process prefix_suffix compatibility table
+        for line in lines:
+            toks = line.split()
 
-                if len(toks) != 2:
-                    raise DatabaseParseError(
-                        'invalid TABLE AC line {}'.format(repr(line)))
+            if len(toks) != 2:
+                raise DatabaseParseError(
+                    'invalid TABLE AC line {}'.format(repr(line.strip())))
 
-                prefix_cat = toks[0]
-                suffix_cat = toks[1]
+            prefix_cat = toks[0]
+            suffix_cat = toks[1]
 
-                if prefix_cat not in self.prefix_suffix_compat:
-                    self.prefix_suffix_compat[prefix_cat] = set()
-                self.prefix_suffix_compat[prefix_cat].add(suffix_cat)
+            if prefix_cat not in self.prefix_suffix_compat:
+                self.prefix_suffix_compat[prefix_cat] = set()
+            self.prefix_suffix_compat[prefix_cat].add(suffix_cat)
 
-            if self._withAnalysis:
-                for prefix in self.prefix_hash.keys():
-                    self.max_prefix_size = max(self.max_prefix_size,
-                                               len(prefix))
-                for suffix in self.suffix_hash.keys():
-                    self.max_suffix_size = max(self.max_suffix_size,
-                                               len(suffix))
+    def _parse_dbfile(self, fpath):
+        with open(fpath, 'r', encoding='utf-8') as dbfile:
+            contents = dbfile.read()
+
+        section_parsers = [
+            self._parse_defines,
+            self._parse_defaults,
+            self._parse_order,
+            self._parse_tokenizations,
+            self._parse_stem_backoffs,
+            self._parse_prefixes,
+            self._parse_suffixes,
+            self._parse_stems,
+            self._parse_table_ab,
+            self._parse_table_bc,
+            self._parse_table_ac,
+        ]
+
+        for section, lines in _iter_db_sections(contents):
+            section_parsers[section](lines)
 
     def all_feats(self):
         """Return a set of all features provided by this database instance.
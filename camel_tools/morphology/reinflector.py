@@ -27,8 +27,6 @@
 
 from __future__ import absolute_import
 
-from collections import deque
-
 import re
 
 from camel_tools.morphology.database import MorphologyDB
@@ -53,6 +51,18 @@ _FILTER_FEATS = frozenset(['pos', 'lex'])
 _ANY_FEATS = frozenset(['per', 'gen', 'num', 'cas', 'stt', 'vox', 'mod',
                         'asp'])
 
+# How each feature of an analysis is handled when building generation features
+_FEAT_NORMAL = 0
+_FEAT_IGNORED = 1
+_FEAT_SPECIFIED = 2
+_FEAT_CLITIC_IGNORED = 3
+
+_FEAT_ACTIONS = {}
+_FEAT_ACTIONS.update((feat, _FEAT_CLITIC_IGNORED)
+                     for feat in _CLITIC_IGNORED_FEATS)
+_FEAT_ACTIONS.update((feat, _FEAT_SPECIFIED) for feat in _SPECIFIED_FEATS)
+_FEAT_ACTIONS.update((feat, _FEAT_IGNORED) for feat in _IGNORED_FEATS)
+
 _LEMMA_SPLIT_RE = re.compile(u'-|_')
 
 
@@ -111,22 +121,23 @@ class Reinflector(object):
         if not analyses or len(analyses) == 0:
             return []
 
-        for feat in feats:
-            if feat not in self._db.defines:
+        defines = self._db.defines
+
+        for feat, val in feats.items():
+            try:
+                feat_vals = defines[feat]
+            except KeyError:
                 raise InvalidReinflectorFeature(feat)
-            elif self._db.defines[feat] is not None:
-                if feat in _ANY_FEATS and feats[feat] == 'ANY':
+
+            if feat_vals is not None:
+                if val == 'ANY' and feat in _ANY_FEATS:
                     continue
-                elif feats[feat] not in self._db.defines[feat]:
-                    raise InvalidReinflectorFeatureValue(feat, feats[feat])
+                elif val not in feat_vals:
+                    raise InvalidReinflectorFeatureValue(feat, val)
 
-        has_clitics = False
-        for feat in _CLITIC_FEATS:
-            if feat in feats:
-                has_clitics = True
-                break
+        has_clitics = not _CLITIC_FEATS.isdisjoint(feats)
 
-        results = deque()
+        results = []
 
         for analysis in analyses:
             if dediac_ar(analysis['diac']) != dediac_ar(word):
@@ -143,24 +154,30 @@ class Reinflector(object):
             is_valid = True
             generate_feats = {}
 
-            for feat in analysis.keys():
-                if feat in _IGNORED_FEATS:
+            for feat, analysis_val in analysis.items():
+                action = _FEAT_ACTIONS.get(feat, _FEAT_NORMAL)
+
+                if action == _FEAT_IGNORED:
                     continue
-                elif feat in _SPECIFIED_FEATS and feat not in feats:
+                elif action == _FEAT_SPECIFIED and feat not in feats:
                     continue
-                elif has_clitics and feat in _CLITIC_IGNORED_FEATS:
+                elif action == _FEAT_CLITIC_IGNORED and has_clitics:
                     continue
                 else:
-                    if feat in feats:
-                        if feats[feat] == 'ANY':
+                    # Feature values are validated above, so a requested
+                    # value is never None here
+                    val = feats.get(feat, None)
+
+                    if val is not None:
+                        if val == 'ANY':
                             continue
-                        elif analysis[feat] != 'na':
-                            generate_feats[feat] = feats[feat]
+                        elif analysis_val != 'na':
+                            generate_feats[feat] = val
                         else:
                             is_valid = False
                             break
-                    elif analysis[feat] != 'na':
-                        generate_feats[feat] = analysis[feat]
+                    elif analysis_val != 'na':
+                        generate_feats[feat] = analysis_val
 
             if is_valid:
                 generated = self._generator.generate(lemma, generate_feats)
@@ -168,9 +185,11 @@ class Reinflector(object):
                     results.extend(generated)
         
         # TODO: Temporary fix to get unique analyses
-        results  = [dict(y) for y in set(tuple(x.items()) for x in results)]
+        unique_results = {}
+        for result in results:
+            unique_results.setdefault(frozenset(result.items()), result)
 
-        return list(results)
+        return list(unique_results.values())
 
     def all_feats(self):
         """Return a set of all features provided by the database used in this
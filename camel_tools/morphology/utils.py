@@ -25,41 +25,37 @@
 """Utility functions used by the various morphology components.
 """
 
-import copy
+from collections import namedtuple
+from functools import lru_cache
 import re
 import sys
 
 
 # eatures which should be concatinated when generating analysis
-_JOIN_FEATS = frozenset(['gloss', 'bw'])
-_CONCAT_FEATS = frozenset(['diac', 'pattern', 'caphi', 'catib6', 'ud'])
-_CONCAT_FEATS_NONE = frozenset(['d3tok', 'd3seg', 'atbseg', 'd2seg', 'd1seg',
-                                'd1tok', 'd2tok', 'atbtok', 'bwtok'])
-_LOGPROB_FEATS = frozenset(['pos_logprob', 'lex_logprob', 'pos_lex_logprob'])
+_JOIN_FEATS = ('gloss', 'bw')
+_CONCAT_FEATS = ('diac', 'pattern', 'caphi', 'catib6', 'ud')
+_CONCAT_FEATS_NONE = ('d3tok', 'd3seg', 'atbseg', 'd2seg', 'd1seg',
+                      'd1tok', 'd2tok', 'atbtok', 'bwtok')
+_LOGPROB_FEATS = ('pos_logprob', 'lex_logprob', 'pos_lex_logprob')
 
 # Tokenization and segmentation schemes to which Sun letters and Fatha after 
 # Alif rewrite rules apply
-_TOK_SCHEMES_1 = frozenset(['d1tok', 'd2tok', 'atbtok', 'd1seg', 'd2seg',
-                            'd3seg', 'atbseg'])
+_TOK_SCHEMES_1 = ('d1tok', 'd2tok', 'atbtok', 'd1seg', 'd2seg',
+                  'd3seg', 'atbseg')
 # Tokenization and segmentation schemes to which only the Fatha after Alif 
 # rewrite rule apply
-_TOK_SCHEMES_2 = frozenset(['d3tok', 'd3seg'])
+_TOK_SCHEMES_2 = ('d3tok', 'd3seg')
 
 # Splits lemmas on '_' and '-'
 _STRIP_LEX_RE = re.compile('_|-')
 
 # Sun letters with definite article
-_REWRITE_DIAC_RE_1 = re.compile(u'#\\+*([\u062a\u062b\u062f\u0630\u0631\u0632'
-                                u'\u0633\u0634\u0635\u0636\u0637\u0638\u0644'
-                                u'\u0646])')
+_SUN_LETTERS = frozenset(u'\u062a\u062b\u062f\u0630\u0631\u0632\u0633\u0634'
+                         u'\u0635\u0636\u0637\u0638\u0644\u0646')
 # Moon letters with definite article
 _REWRITE_DIAC_RE_2 = re.compile(u'#\\+*')
 # Fatha after Alif
 _REWRITE_DIAC_RE_3 = re.compile(u'\u0627\\+?\u064e([\u0629\u062a])')
-# Hamza Wasl
-_REWRITE_DIAC_RE_4 = re.compile(u'\u0671')
-# Remove '+'s
-_REWRITE_DIAC_RE_5 = re.compile(u'\\+')
 # Fix Multiple Shadda's
 # FIXME: Remove after DB fix
 _REWRITE_DIAC_RE_6 = re.compile(u'\u0651+')
@@ -84,8 +80,20 @@ _REWRITE_CAPHI_RE_7 = re.compile(u'u\\+w(_+[^ioua])')
 _REWRITE_CAPHI_RE_8 = re.compile(u'p-\\+([iua])')
 # Compress alef madda followed by fatha followed by short vowels
 _REWRITE_CAPHI_RE_9 = re.compile(u'aa\\+a[_]*')
+# Matches wherever any of the rewrites above would apply. If it doesn't
+# match, none of them change the word and they can all be skipped at once.
+_REWRITE_CAPHI_ANY_RE = re.compile(u'|'.join(
+    u'(?:{})'.format(r.pattern) for r in (_REWRITE_CAPHI_RE_1,
+                                          _REWRITE_CAPHI_RE_2,
+                                          _REWRITE_CAPHI_RE_3,
+                                          _REWRITE_CAPHI_RE_4,
+                                          _REWRITE_CAPHI_RE_5,
+                                          _REWRITE_CAPHI_RE_6,
+                                          _REWRITE_CAPHI_RE_7,
+                                          _REWRITE_CAPHI_RE_8,
+                                          _REWRITE_CAPHI_RE_9)))
 # Remove '+'s
-_REWRITE_CAPHI_RE_10 = re.compile(u'[\\+-]')
+_REWRITE_CAPHI_TRANS_10 = str.maketrans({u'+': u'_', u'-': u'_'})
 # Remove multiple '_'
 _REWRITE_CAPHI_RE_11 = re.compile(u'_+')
 # Remove initial and tailing underscores tailing taa marboutah
@@ -135,12 +143,45 @@ _AR2CAPHI = {
         '\u0649': 'aa',
         '\u064A': 'y'
 }
+# Same as above but with the '_' separator prepended to each value
+_AR2CAPHI_JOIN = {c: u'_' + v for c, v in _AR2CAPHI.items()}
+
+
+# The same few thousand words and clitics make up most of any text, so the
+# string rewrites below are memoized
+_REWRITE_CACHE_SIZE = 65536
+
+# The features of each kind above that are defined in a given database
+MergeFeats = namedtuple('MergeFeats', ['join', 'concat', 'concat_none',
+                                       'tok_1', 'tok_2', 'logprob'])
 
 
+def get_merge_feats(defines):
+    """Get the features handled by :func:`merge_features` that are defined
+    in a given database.
+
+    Args:
+        defines (:obj:`dict`): The database's feature definitions.
+
+    Returns:
+        :obj:`MergeFeats`: The defined features of each kind.
+    """
+
+    return MergeFeats(
+        join=tuple(f for f in _JOIN_FEATS if f in defines),
+        concat=tuple(f for f in _CONCAT_FEATS if f in defines),
+        concat_none=tuple(f for f in _CONCAT_FEATS_NONE if f in defines),
+        tok_1=tuple(f for f in _TOK_SCHEMES_1 if f in defines),
+        tok_2=tuple(f for f in _TOK_SCHEMES_2 if f in defines),
+        logprob=tuple(f for f in _LOGPROB_FEATS if f in defines))
+
+
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def strip_lex(lex):
     return _STRIP_LEX_RE.split(lex)[0]
 
 
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def simple_ar_to_caphi(ar_str):
     """Convert Arabic script to CAPHI.
     Args:
@@ -152,10 +193,17 @@ def simple_ar_to_caphi(ar_str):
     if ar_str.startswith('\u0627'):
         ar_str = '\u0623{}'.format(ar_str[1:])
 
-    return '_'.join([_AR2CAPHI[x] for x in ar_str if x in _AR2CAPHI])
+    # Characters without a mapping are dropped, and the leading separator
+    # is stripped from the result
+    return u''.join([_AR2CAPHI_JOIN.get(x, u'') for x in ar_str])[1:]
 
 
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def normalize_tanwyn(word, mode='AF'):
+    # All the patterns are anchored on the tanwyn mark
+    if u'\u064b' not in word:
+        return word
+
     if mode == 'FA':
         word = _NORMALIZE_TANWYN_FA_RE.sub(u'\u064b\u0627', word)
         word = _NORMALIZE_TANWYN_FY_RE.sub(u'\u064b\u0649', word)
@@ -165,56 +213,105 @@ def normalize_tanwyn(word, mode='AF'):
     return word
 
 
+def _rewrite_def_article(word):
+    # Replaces '#' followed by any number of '+'s with a shadda on the next
+    # letter if it's a Sun letter and removes it otherwise
+    parts = []
+    start = 0
+    end = len(word)
+    pos = word.find(u'#')
+
+    while pos != -1:
+        parts.append(word[start:pos])
+        pos += 1
+
+        while pos < end and word[pos] == u'+':
+            pos += 1
+
+        if pos < end and word[pos] in _SUN_LETTERS:
+            parts.append(word[pos] + u'\u0651')
+            pos += 1
+
+        start = pos
+        pos = word.find(u'#', pos)
+
+    parts.append(word[start:])
+
+    return u''.join(parts)
+
+
+def _rewrite_article_alif(word):
+    # Sun letters and Fatha after Alif rewrites shared by rewrite_diac and
+    # rewrite_tok_1. Each rewrite is keyed on a marker that is usually
+    # missing, and a substring check is much cheaper than a regex pass.
+    if u'#' in word:
+        word = _rewrite_def_article(word)
+    if u'\u064e' in word:
+        word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
+
+    return word
+
+
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def rewrite_diac(word):
-    word = _REWRITE_DIAC_RE_1.sub(u'\\1\u0651', word)
-    word = _REWRITE_DIAC_RE_2.sub(u'', word)
-    word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
-    word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
-    word = _REWRITE_DIAC_RE_5.sub(u'', word)
-    word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
+    word = _rewrite_article_alif(word)
+    # Hamza Wasl
+    word = word.replace(u'\u0671', u'\u0627')
+    # Remove '+'s
+    word = word.replace(u'+', u'')
+    if u'\u0651\u0651' in word:
+        word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
 
     return word
 
 
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def rewrite_caphi(word):
-    word = _REWRITE_CAPHI_RE_1.sub(u'\\2\\2', word)
-    word = _REWRITE_CAPHI_RE_2.sub(u'\\1_\\1', word)
-    word = _REWRITE_CAPHI_RE_3.sub(u'ii_\\1', word)
-    word = _REWRITE_CAPHI_RE_4.sub(u'uu_\\1', word)
-    word = _REWRITE_CAPHI_RE_5.sub(u'\\1', word)
-    word = _REWRITE_CAPHI_RE_6.sub(u'\\1_\\2', word)
-    word = _REWRITE_CAPHI_RE_7.sub(u'uu\\1', word)
-    word = _REWRITE_CAPHI_RE_8.sub(u't_\\1', word)
-    word = _REWRITE_CAPHI_RE_9.sub(u'aa_', word)
-    word = _REWRITE_CAPHI_RE_10.sub(u'_', word)
-    word = _REWRITE_CAPHI_RE_11.sub(u'_', word)
+    # The rewrites have to be applied in order since each one can create or
+    # destroy matches for the ones that follow, but most words match none
+    # of them. All of them need a '+' to match.
+    if u'+' in word and _REWRITE_CAPHI_ANY_RE.search(word) is not None:
+        word = _REWRITE_CAPHI_RE_1.sub(u'\\2\\2', word)
+        word = _REWRITE_CAPHI_RE_2.sub(u'\\1_\\1', word)
+        word = _REWRITE_CAPHI_RE_3.sub(u'ii_\\1', word)
+        word = _REWRITE_CAPHI_RE_4.sub(u'uu_\\1', word)
+        word = _REWRITE_CAPHI_RE_5.sub(u'\\1', word)
+        word = _REWRITE_CAPHI_RE_6.sub(u'\\1_\\2', word)
+        word = _REWRITE_CAPHI_RE_7.sub(u'uu\\1', word)
+        word = _REWRITE_CAPHI_RE_8.sub(u't_\\1', word)
+        word = _REWRITE_CAPHI_RE_9.sub(u'aa_', word)
+
+    word = word.translate(_REWRITE_CAPHI_TRANS_10)
+    if u'__' in word:
+        word = _REWRITE_CAPHI_RE_11.sub(u'_', word)
     word = _REWRITE_CAPHI_RE_12.sub(u'', word)
 
     return word
 
 
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def rewrite_tok_1(word):
-    word = _REWRITE_DIAC_RE_1.sub(u'\\1\u0651', word)
-    word = _REWRITE_DIAC_RE_2.sub(u'', word)
-    word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
-
-    return word
+    return _rewrite_article_alif(word)
 
 
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def rewrite_tok_2(word):
-    word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
+    if u'\u064e' in word:
+        word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
 
     return word
 
 
+@lru_cache(maxsize=_REWRITE_CACHE_SIZE)
 def rewrite_pattern(word):
-    word = _REWRITE_DIAC_RE_2.sub(u'', word)
+    if u'#' in word:
+        word = _REWRITE_DIAC_RE_2.sub(u'', word)
 
     return word
 
 
 def merge_features(db, prefix_feats, stem_feats, suffix_feats, diac_mode="AF"):
-    result = copy.copy(stem_feats)
+    result = stem_feats.copy()
 
     for stem_feat in stem_feats:
         suffix_feat_val = suffix_feats.get(stem_feat, '')
@@ -225,29 +322,26 @@ def merge_features(db, prefix_feats, stem_feats, suffix_feats, diac_mode="AF"):
         if prefix_feat_val != '-' and prefix_feat_val != '':
             result[stem_feat] = prefix_feat_val
 
-    for join_feat in _JOIN_FEATS:
-        if join_feat in db.defines:
-            feat_vals = [
-                prefix_feats.get(join_feat, None),
-                stem_feats.get(join_feat, None),
-                suffix_feats.get(join_feat, None)
-            ]
-            result[join_feat] = u'+'.join([fv for fv in feat_vals
-                                           if fv is not None and fv != ''])
-
-    for concat_feat in _CONCAT_FEATS:
-        if concat_feat in db.defines:
-            result[concat_feat] = u'+'.join([x for x in [
-                prefix_feats.get(concat_feat, ''),
-                stem_feats.get(concat_feat, ''),
-                suffix_feats.get(concat_feat, '')] if len(x) > 0])
-
-    for concat_feat in _CONCAT_FEATS_NONE:
-        if concat_feat in db.defines:
-            result[concat_feat] = u'{}{}{}'.format(
-                prefix_feats.get(concat_feat, ''),
-                stem_feats.get(concat_feat, stem_feats.get('diac', '')),
-                suffix_feats.get(concat_feat, ''))
+    merge_feats = db.merge_feats
+
+    # Join and concat features skip missing and empty values
+    for join_feat in merge_feats.join:
+        feat_vals = (prefix_feats.get(join_feat, None),
+                     stem_feats.get(join_feat, None),
+                     suffix_feats.get(join_feat, None))
+        result[join_feat] = u'+'.join([fv for fv in feat_vals if fv])
+
+    for concat_feat in merge_feats.concat:
+        feat_vals = (prefix_feats.get(concat_feat, ''),
+                     stem_feats.get(concat_feat, ''),
+                     suffix_feats.get(concat_feat, ''))
+        result[concat_feat] = u'+'.join([fv for fv in feat_vals if fv])
+
+    stem_diac = stem_feats.get('diac', '')
+    for concat_feat in merge_feats.concat_none:
+        result[concat_feat] = (prefix_feats.get(concat_feat, '') +
+                               stem_feats.get(concat_feat, stem_diac) +
+                               suffix_feats.get(concat_feat, ''))
 
     result['stem'] = stem_feats['diac']
     result['stemgloss'] = stem_feats.get('gloss', '')
@@ -255,13 +349,18 @@ def merge_features(db, prefix_feats, stem_feats, suffix_feats, diac_mode="AF"):
     result['diac'] = normalize_tanwyn(rewrite_diac(result['diac']),
                                       diac_mode)
 
-    for feat in _TOK_SCHEMES_1:
-        if feat in db.defines:
-            result[feat] = rewrite_tok_1(result.get(feat, ''))
+    # Tokenization schemes frequently share the same value, in which case
+    # the previous rewrite is reused
+    tok_val = tok_rewritten = None
+    for feat in merge_feats.tok_1:
+        feat_val = result.get(feat, '')
+        if feat_val != tok_val:
+            tok_val = feat_val
+            tok_rewritten = rewrite_tok_1(feat_val)
+        result[feat] = tok_rewritten
 
-    for feat in _TOK_SCHEMES_2:
-        if feat in db.defines:
-            result[feat] = rewrite_tok_2(result.get(feat, ''))
+    for feat in merge_feats.tok_2:
+        result[feat] = rewrite_tok_2(result.get(feat, ''))
 
     if 'caphi' in db.defines:
         result['caphi'] = rewrite_caphi(result.get('caphi', ''))
@@ -279,9 +378,8 @@ def merge_features(db, prefix_feats, stem_feats, suffix_feats, diac_mode="AF"):
                                              suffix_feats.get('diac', ''))
         result['pattern'] = rewrite_pattern(result['pattern'])
 
-    for logprob_feat in _LOGPROB_FEATS:
-        if logprob_feat in db.defines:
-            result[logprob_feat] = float(result.get(logprob_feat, -99.0))
+    for logprob_feat in merge_feats.logprob:
+        result[logprob_feat] = float(result.get(logprob_feat, -99.0))
 
     return result
 
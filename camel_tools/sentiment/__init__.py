@@ -28,11 +28,14 @@
 """
 
 import torch
-import torch.nn.functional as torch_fun
-from torch.utils.data import Dataset, DataLoader
-from transformers import BertTokenizer, BertForSequenceClassification
+from torch.utils.data import Dataset
+from transformers import BertForSequenceClassification
 
 from camel_tools.data import CATALOGUE
+from camel_tools.utils._bert import compile_forward
+from camel_tools.utils._bert import label_array
+from camel_tools.utils._bert import length_sorted_loader
+from camel_tools.utils._bert import load_bert_tokenizer
 
 
 _LABELS = ('positive', 'negative', 'neutral')
@@ -44,7 +47,8 @@ class SentimentDataset(Dataset):
     Args:
         sentences (:obj:`list` of :obj:`list` of :obj:`str`): The input
             sentences.
-        tokenizer (:obj:`PreTrainedTokenizer`): Bert's pretrained tokenizer.
+        tokenizer (:obj:`PreTrainedTokenizerFast`): Bert's pretrained fast
+            tokenizer.
         max_seq_length (:obj:`int`):  Maximum sentence length.
     """
 
@@ -52,12 +56,15 @@ class SentimentDataset(Dataset):
         self.encoded_sents = tokenizer(sentences, add_special_tokens=True,
                                        padding=True, max_length=max_seq_length,
                                        truncation=True, return_tensors="pt")
+        # Number of tokens of each sentence before padding
+        self.seq_lengths = self.encoded_sents.attention_mask.sum(dim=1)
 
     def __getitem__(self, idx):
         return {
             'input_ids': self.encoded_sents.input_ids[idx],
             'token_type_ids':  self.encoded_sents.token_type_ids[idx],
-            'attention_mask': self.encoded_sents.attention_mask[idx]
+            'attention_mask': self.encoded_sents.attention_mask[idx],
+            'seq_length': self.seq_lengths[idx]
         }
 
     def __len__(self):
@@ -71,16 +78,36 @@ class SentimentAnalyzer:
         model_path (:obj:`str`): The path to the fine-tuned model.
         use_gpu (:obj:`bool`, optional): The flag to use a GPU or not.
             Defaults to True.
+        dtype (:obj:`torch.dtype`, optional): Precision to run the model in,
+            eg. `torch.bfloat16`. Sentiment labels may occasionally differ
+            from those predicted in full precision. If None, the model is run
+            in the precision it was saved in. Defaults to None.
+        compile_model (:obj:`bool`, optional): If True, the model is compiled
+            with `torch.compile` the first time :meth:`predict` is called,
+            which is only worth it for large numbers of sentences.
+            Defaults to False.
     """
 
-    def __init__(self, model_path, use_gpu=True):
+    def __init__(self, model_path, use_gpu=True, dtype=None,
+                 compile_model=False):
         self.model = BertForSequenceClassification.from_pretrained(model_path)
-        self.tokenizer = BertTokenizer.from_pretrained(model_path)
+        if dtype is not None:
+            self.model.to(dtype=dtype)
+        self.tokenizer = load_bert_tokenizer(model_path)
         self.labels_map = self.model.config.id2label
+        self._label_arr = label_array(self.labels_map)
         self.use_gpu = use_gpu
 
+        self._device = torch.device(
+            'cuda' if use_gpu and torch.cuda.is_available() else 'cpu')
+        self.model.to(self._device)
+        self.model.eval()
+
+        self._forward = compile_forward(self.model, compile_model)
+
     @staticmethod
-    def pretrained(model_name=None, use_gpu=True):
+    def pretrained(model_name=None, use_gpu=True, dtype=None,
+                   compile_model=False):
         """Load a pre-trained model provided with camel_tools.
 
         Args:
@@ -91,6 +118,10 @@ class SentimentAnalyzer:
                 Defaults to None.
             use_gpu (:obj:`bool`, optional): The flag to use a GPU or not.
                 Defaults to True.
+            dtype (:obj:`torch.dtype`, optional): See
+                :obj:`SentimentAnalyzer`. Defaults to None.
+            compile_model (:obj:`bool`, optional): See
+                :obj:`SentimentAnalyzer`. Defaults to False.
 
         Returns:
             :obj:`SentimentAnalyzer`: Instance with loaded pre-trained model.
@@ -103,7 +134,7 @@ class SentimentAnalyzer:
                       .datasets[model_name])
         model_path = str(model_info.path)
 
-        return SentimentAnalyzer(model_path, use_gpu)
+        return SentimentAnalyzer(model_path, use_gpu, dtype, compile_model)
 
     @staticmethod
     def labels():
@@ -139,31 +170,31 @@ class SentimentAnalyzer:
             sentences.
         """
 
+        if len(sentences) == 0:
+            return []
+
         sentiment_dataset = SentimentDataset(sentences, self.tokenizer,
                                              max_seq_length=512)
+        num_sentences = len(sentiment_dataset)
 
-        data_loader = DataLoader(sentiment_dataset, batch_size=batch_size,
-                                 shuffle=False, drop_last=False)
-
-        device = ('cuda' if self.use_gpu and torch.cuda.is_available() else
-                  'cpu')
+        batches, data_loader = length_sorted_loader(
+            sentiment_dataset, sentiment_dataset.seq_lengths.tolist(),
+            batch_size, self._device)
 
-        self.model.to(device)
-        self.model.eval()
+        # Predictions are written back into their original positions
+        max_predictions = torch.empty(num_sentences, dtype=torch.long)
 
-        predicted_labels = []
+        with torch.inference_mode():
+            for batch_indices, batch in zip(batches, data_loader):
+                inputs = {k: v.to(self._device, non_blocking=True)
+                          for k, v in batch.items()}
+                logits = self._forward(**inputs)[0]
 
-        with torch.no_grad():
-            for batch in data_loader:
-                batch = {k: v.to(device) for k, v in batch.items()}
-                inputs = {'input_ids': batch['input_ids'],
-                          'token_type_ids': batch['token_type_ids'],
-                          'attention_mask': batch['attention_mask']}
-                logits = self.model(**inputs)[0]
+                # Softmax is monotonic, so the predicted labels can be taken
+                # directly from the logits
+                max_predictions[batch_indices] = torch.argmax(logits,
+                                                              dim=-1).cpu()
 
-                predictions = torch_fun.softmax(logits, dim=-1)
-                max_predictions = torch.argmax(predictions, dim=-1)
-                batch_preds = [self.labels_map[p.item()] for p in max_predictions]
-                predicted_labels.extend(batch_preds)
+        predicted_labels = self._label_arr[max_predictions.numpy()].tolist()
 
         return predicted_labels
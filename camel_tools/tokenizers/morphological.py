@@ -27,20 +27,36 @@
 """
 
 
+from functools import lru_cache
 import re
-from collections import deque
 from camel_tools.utils.dediac import dediac_ar
 
 
 # Reduce consequitive '+'s to one
 _REMOVE_PLUSES = re.compile(r'(_\+|\+_)+')
 
+# Tokens repeat a lot in running text, so dediacritized tokens are cached
+_DEDIAC_CACHE_SIZE = 65536
+
+
+def _no_dediac(tok):
+    return tok
+
+
+@lru_cache(maxsize=_DEDIAC_CACHE_SIZE)
 def _default_dediac(tok):
     return dediac_ar(tok)
 
 
+@lru_cache(maxsize=_DEDIAC_CACHE_SIZE)
 def _bwtok_dediac(tok):
-    return _REMOVE_PLUSES.sub(r'\g<1>', dediac_ar(tok).strip('+_'))
+    tok = dediac_ar(tok).strip('+_')
+
+    # Only tokens with a '+' next to a '_' have anything to reduce
+    if '_+' not in tok and '+_' not in tok:
+        return tok
+
+    return _REMOVE_PLUSES.sub(r'\g<1>', tok)
 
 _DIAC_TYPE = {
     'atbtok': _default_dediac,
@@ -83,7 +99,7 @@ class MorphologicalTokenizer(object):
         self._disambiguator = disambiguator
         self._scheme = scheme
         self._split = split
-        self._diacf = lambda w: w if diac else _DIAC_TYPE[self._scheme](w)
+        self._diacf = _no_dediac if diac else _DIAC_TYPE[scheme]
 
     def tokenize(self, words):
         """Generate morphological tokens for a given list of words.
@@ -96,24 +112,30 @@ class MorphologicalTokenizer(object):
         """
 
         disambig_words = self._disambiguator.disambiguate(words)
-        result = deque()
+        result = []
+
+        scheme = self._scheme
+        split = self._split
+        diacf = self._diacf
+        result_append = result.append
+        result_extend = result.extend
 
         for disambig_word in disambig_words:
             scored_analyses = disambig_word.analyses
             if len(scored_analyses) > 0:
                 analysis = scored_analyses[0].analysis
-                tok = analysis.get(self._scheme, None)
+                tok = analysis.get(scheme, None)
 
                 if tok is None or tok == 'NOAN':
                     tok = disambig_word.word
-                    result.append(self._diacf(tok))
-                elif self._split:
-                    tok = self._diacf(tok)
-                    result.extend(tok.split('_'))
+                    result_append(diacf(tok))
+                elif split:
+                    tok = diacf(tok)
+                    result_extend(tok.split('_'))
                 else:
-                    result.append(self._diacf(tok))
+                    result_append(diacf(tok))
 
             else:
-                result.append(disambig_word.word)
+                result_append(disambig_word.word)
 
-        return list(result)
+        return result
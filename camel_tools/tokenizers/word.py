@@ -27,6 +27,7 @@
 """
 
 
+from functools import lru_cache
 import re
 
 from camel_tools.utils.charsets import UNICODE_PUNCT_SYMBOL_CHARSET
@@ -40,19 +41,64 @@ from camel_tools.utils.charsets import EMOJI_MULTICHAR_CHARSET
 __all__ = ['simple_word_tokenize']
 
 
-_ALL_PUNCT_SYMBOLS = (UNICODE_PUNCT_SYMBOL_CHARSET | EMOJI_MULTICHAR_CHARSET)
-_ALL_PUNCT_SYMBOLS = [re.escape(x) for x in _ALL_PUNCT_SYMBOLS]
-_ALL_PUNCT_SYMBOLS = sorted(_ALL_PUNCT_SYMBOLS, key=len, reverse=True)
+def _char_class(charset):
+    """Builds a regex character class matching the characters in a given set.
 
-_ALL_NUMBER = u''.join(UNICODE_NUMBER_CHARSET)
-_ALL_LETTER_MARK = u''.join((UNICODE_LETTER_CHARSET | UNICODE_MARK_CHARSET))
-_ALL_LETTER_MARK_NUMBER = u''.join(UNICODE_LETTER_MARK_NUMBER_CHARSET)
+    The class is written as ranges of consecutive code points rather than as
+    a list of every single character. Classes listing many characters,
+    especially ones outside the BMP, are otherwise matched by checking the
+    characters one by one which makes matching dramatically slower.
+    """
+
+    code_points = sorted(ord(c) for c in charset)
+    ranges = []
+    start = end = code_points[0]
+
+    for code_point in code_points[1:]:
+        if code_point == end + 1:
+            end = code_point
+        else:
+            ranges.append((start, end))
+            start = end = code_point
+
+    ranges.append((start, end))
 
-_TOKENIZE_RE = re.compile(u'|'.join(_ALL_PUNCT_SYMBOLS) + r'|[' +
-                          re.escape(_ALL_LETTER_MARK_NUMBER) + r']+')
-_TOKENIZE_NUMBER_RE = re.compile(u'|'.join(_ALL_PUNCT_SYMBOLS) + r'|[' +
-                                 re.escape(_ALL_NUMBER) + r']+|[' +
-                                 re.escape(_ALL_LETTER_MARK) + r']+')
+    return u'[{}]'.format(u''.join(
+        re.escape(chr(start)) if start == end else
+        u'{}-{}'.format(re.escape(chr(start)), re.escape(chr(end)))
+        for start, end in ranges))
+
+
+@lru_cache(maxsize=None)
+def _tokenize_re(split_digits):
+    """Builds the tokenization regex on first use. Building the character
+    classes and compiling the pattern takes a noticeable part of a second, so
+    it is not done when the module is imported.
+    """
+
+    # Multi-character emoji sequences are tried longest first and before
+    # single punctuation/symbol characters, same as when all of them were
+    # sorted by length in a single alternation. The alternation of thousands
+    # of sequences is only tried at positions holding a character some
+    # sequence starts with.
+    emoji_multichar = sorted((re.escape(x) for x in EMOJI_MULTICHAR_CHARSET),
+                             key=len, reverse=True)
+    emoji_multichar = u'(?={})(?:{})'.format(
+        _char_class(frozenset(x[0] for x in EMOJI_MULTICHAR_CHARSET)),
+        u'|'.join(emoji_multichar))
+
+    punct_symbol = _char_class(UNICODE_PUNCT_SYMBOL_CHARSET)
+
+    if split_digits:
+        number = _char_class(UNICODE_NUMBER_CHARSET)
+        letter_mark = _char_class(UNICODE_LETTER_CHARSET |
+                                  UNICODE_MARK_CHARSET)
+        return re.compile(emoji_multichar + u'|' + punct_symbol + u'|' +
+                          number + u'+|' + letter_mark + u'+')
+
+    letter_mark_number = _char_class(UNICODE_LETTER_MARK_NUMBER_CHARSET)
+    return re.compile(emoji_multichar + u'|' + punct_symbol + u'|' +
+                      letter_mark_number + u'+')
 
 
 def simple_word_tokenize(sentence, split_digits=False):
@@ -76,7 +122,4 @@ def simple_word_tokenize(sentence, split_digits=False):
         :obj:`list` of :obj:`str`: The list of tokens.
     """
 
-    if split_digits:
-        return _TOKENIZE_NUMBER_RE.findall(sentence)
-    else:
-        return _TOKENIZE_RE.findall(sentence)
+    return _tokenize_re(bool(split_digits)).findall(sentence)
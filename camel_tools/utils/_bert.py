@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2024 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Helpers shared by the BERT based components: loading their fast
+tokenizers, preparing their models for inference (compiling the forward
+pass), batching their already featurized inputs and mapping predicted label
+ids to labels.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from transformers import BertTokenizerFast
+
+
+_MODEL_INPUTS = ('input_ids', 'token_type_ids', 'attention_mask')
+
+
+@lru_cache(maxsize=8)
+def load_bert_tokenizer(model_path):
+    """Load the fast BERT tokenizer of a fine-tuned model. Tokenizers are
+    cached by model path, so loading several components (or the same component
+    several times) from one model only parses its vocabulary once.
+
+    Tokenizers returned by this function are shared and must not be modified.
+
+    Args:
+        model_path (:obj:`str`): The path to the fine-tuned model.
+
+    Returns:
+        :obj:`BertTokenizerFast`: The model's tokenizer.
+    """
+
+    return BertTokenizerFast.from_pretrained(model_path)
+
+
+def compile_forward(model, compile_model):
+    """Get the callable running a model's forward pass.
+
+    Args:
+        model (:obj:`torch.nn.Module`): The model.
+        compile_model (:obj:`bool`): The flag to compile the forward pass with
+            `torch.compile`. Ignored if `torch.compile` is not available.
+
+    Returns:
+        :obj:`callable`: The compiled model if compilation was requested and
+        is available, otherwise the model itself.
+    """
+
+    # Batches are only padded up to their longest sequence, so their shapes
+    # vary. Compiling for dynamic shapes avoids recompiling the model for
+    # every new sequence length.
+    if compile_model and hasattr(torch, 'compile'):
+        return torch.compile(model, dynamic=True)
+
+    return model
+
+
+def label_array(id2label):
+    """Build an array of a model's labels indexed by label id. Label ids are
+    dense, so indexing the array avoids dict lookups and maps a whole array of
+    predicted label ids to labels in one go.
+
+    Args:
+        id2label (:obj:`dict`): The model's mapping from label ids to labels.
+
+    Returns:
+        :obj:`np.ndarray`: An object array holding the label of each label id.
+    """
+
+    return np.array([id2label[i] for i in range(len(id2label))], dtype=object)
+
+
+def collate_trimmed(features):
+    """Collates the model inputs of a list of features into a batch, trimming
+    off the padding past the longest sequence in the batch.
+
+    Args:
+        features (:obj:`list` of :obj:`dict`): The features to collate. Each
+            one holds its `input_ids`, `token_type_ids` and `attention_mask`
+            padded to the same length, and its unpadded `seq_length`.
+
+    Returns:
+        :obj:`dict`: The batched `input_ids`, `token_type_ids` and
+        `attention_mask` tensors.
+    """
+
+    seq_length = max(int(feature['seq_length']) for feature in features)
+
+    return {k: torch.stack([feature[k][:seq_length] for feature in features])
+            for k in _MODEL_INPUTS}
+
+
+def length_sorted_loader(dataset, seq_lengths, batch_size, device):
+    """Create a data loader over a dataset of already featurized sequences
+    that batches sequences of similar lengths together and only pads each
+    batch up to its longest sequence. This avoids spending most of the compute
+    on padding.
+
+    Args:
+        dataset (:obj:`Dataset`): The dataset, whose items are collated by
+            :func:`collate_trimmed`.
+        seq_lengths (:obj:`list` of :obj:`int`): The unpadded length of each
+            sequence in **dataset**.
+        batch_size (:obj:`int`): The batch size.
+        device (:obj:`torch.device`): The device the batches will be copied
+            to.
+
+    Returns:
+        :obj:`tuple`: The dataset indices of each batch (:obj:`list` of
+        :obj:`list` of :obj:`int`) and the data loader yielding the batches in
+        the same order.
+    """
+
+    order = sorted(range(len(seq_lengths)), key=seq_lengths.__getitem__)
+    batches = [order[i:i + batch_size]
+               for i in range(0, len(order), batch_size)]
+
+    # Features are computed up front, so worker processes would have nothing
+    # to do besides collating. Pinned batches let non-blocking copies to the
+    # GPU actually run asynchronously.
+    data_loader = DataLoader(dataset, batch_sampler=batches,
+                             collate_fn=collate_trimmed,
+                             pin_memory=device.type == 'cuda')
+
+    return batches, data_loader
@@ -28,7 +28,6 @@ other strings) and custom exceptions raised by CharMapper.
 
 from __future__ import absolute_import
 
-from collections import deque
 from collections.abc import Mapping
 import os
 import json
@@ -74,6 +73,22 @@ class BuiltinCharMapNotFoundError(ValueError):
         return self.message
 
 
+class _DefaultTable(dict):
+    """A :func:`str.translate` table that maps characters missing from it to
+    a default value. Missing characters are added to the table the first time
+    they are looked up so that each distinct character only falls back to
+    Python code once.
+    """
+
+    def __init__(self, table, default):
+        super(_DefaultTable, self).__init__(table)
+        self._default = default
+
+    def __missing__(self, key):
+        self[key] = self._default
+        return self._default
+
+
 class CharMapper(object):
     """A class for mapping characters in a Unicode string to other strings.
 
@@ -206,6 +221,20 @@ class CharMapper(object):
                 ('Expected a Unicode string or None value for default, got {} '
                  'instead.').format(type(default)))
 
+        # Mapping is a plain str.translate() call. Without a default, entries
+        # mapped to None are left out since str.translate() would delete those
+        # characters rather than keep them. With a default, they are mapped to
+        # themselves explicitly and every other character maps to the default.
+        if self._default is None:
+            self._table = {ord(char): value
+                           for char, value in self._charmap.items()
+                           if value is not None}
+        else:
+            self._table = _DefaultTable(
+                {ord(char): char if value is None else value
+                 for char, value in self._charmap.items()},
+                self._default)
+
     def __call__(self, s):
         """Alias for :func:`CharMapper.map_string`.
         """
@@ -296,13 +325,4 @@ class CharMapper(object):
                 'Expected Unicode string as input, got {} instead.'
             ).format(type(s)))
 
-        buff = deque()
-
-        for char in s:
-            transliteration = self._charmap.get(char, self._default)
-            if transliteration is None:
-                buff.append(char)
-            else:
-                buff.append(transliteration)
-
-        return ''.join(buff)
+        return s.translate(self._table)
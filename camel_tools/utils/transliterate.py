@@ -28,7 +28,7 @@ CharMapper).
 
 from __future__ import absolute_import
 
-from collections import deque
+from functools import lru_cache
 import re
 import six
 
@@ -36,6 +36,15 @@ from camel_tools.utils.charmap import CharMapper
 
 
 _WHITESPACE_RE = re.compile(r'\s')
+_MARKER_RE_CACHE_SIZE = 32
+
+
+@lru_cache(maxsize=_MARKER_RE_CACHE_SIZE)
+def _marker_re(marker):
+    # Transliterators are often created over and over with the same marker,
+    # so the compiled marker pattern is shared between them
+    return re.compile(r'({}\S+)'.format(re.escape(marker)),
+                      re.UNICODE | re.MULTILINE)
 
 
 class Transliterator(object):
@@ -72,13 +81,11 @@ class Transliterator(object):
             raise ValueError('Marker is empty.')
         elif _WHITESPACE_RE.search(marker) is None:
             self._marker = marker
+            self._marker_len = len(marker)
         else:
             raise ValueError('Marker contains whitespace.')
 
-        self._markerre = re.compile(
-            r'({}\S+)'.format(re.escape(marker)),
-            re.UNICODE | re.MULTILINE
-        )
+        self._markerre = _marker_re(marker)
 
     def transliterate(self, s, strip_markers=False, ignore_markers=False):
         """Transliterate a given string.
@@ -99,23 +106,43 @@ class Transliterator(object):
             marked words.
         """
 
-        buff = deque()
-
-        splits = self._markerre.split(s)
-        for spl in splits:
-            if spl.startswith(self._marker):
-                if ignore_markers:
-                    if not strip_markers:
-                        buff.append(self._marker)
-                    buff.append(
-                        self._mapper.map_string(spl[len(self._marker):])
-                    )
-                else:
-                    if strip_markers:
-                        buff.append(spl[len(self._marker):])
-                    else:
-                        buff.append(spl)
-            else:
-                buff.append(self._mapper.map_string(spl))
+        # Most strings have no marked tokens at all, and a plain substring
+        # check is much cheaper than running the marker regex over them
+        if self._marker not in s:
+            return self._mapper.map_string(s)
+
+        buff = []
+        last = 0
+
+        # Walking over the marked tokens and slicing out the text between them
+        # avoids building the intermediate list of segments re.split does
+        for match in self._markerre.finditer(s):
+            buff.append(self._transliterate_segment(s[last:match.start()],
+                                                    strip_markers,
+                                                    ignore_markers))
+            buff.append(self._transliterate_segment(match.group(),
+                                                    strip_markers,
+                                                    ignore_markers))
+            last = match.end()
+
+        buff.append(self._transliterate_segment(s[last:], strip_markers,
+                                                ignore_markers))
 
         return u''.join(buff)
+
+    def _transliterate_segment(self, segment, strip_markers, ignore_markers):
+        if segment.startswith(self._marker):
+            if ignore_markers:
+                mapped = self._mapper.map_string(segment[self._marker_len:])
+
+                if strip_markers:
+                    return mapped
+
+                return self._marker + mapped
+
+            if strip_markers:
+                return segment[self._marker_len:]
+
+            return segment
+
+        return self._mapper.map_string(segment)
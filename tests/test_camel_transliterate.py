@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2024 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Tests for camel_tools.cli.camel_transliterate
+"""
+
+from __future__ import absolute_import
+
+import io
+
+import pytest
+
+from camel_tools.cli import camel_transliterate
+from camel_tools.utils.charmap import CharMapper
+from camel_tools.utils.transliterate import Transliterator
+
+
+MARKER = u'@@IGNORE@@'
+TEST_MAPPER = CharMapper({u'A-Z': u'X', u'a-z': u'x'}, None)
+TEST_TRANSLITERATOR = Transliterator(TEST_MAPPER, MARKER)
+
+# Lines without markers, marked tokens, a bare marker at the start of a line
+# (which Transliterator treats specially) and a line much longer than the
+# block sizes used below.
+TEST_LINES = [
+    u'Hello, world!\n',
+    u'\n',
+    u'@@IGNORE@@Hello world @@IGNORE@@foo bar\n',
+    u'@@IGNORE@@ hello\n',
+    u'abc@@IGNORE@@def ghi\n',
+    u'The quick brown fox jumps over the lazy dog. ' * 5 + u'\n',
+    u'@@IGNORE@@\n',
+    u'last line',
+]
+
+
+def _transliterate_lines(text, strip_markers, ignore_markers):
+    return u''.join([TEST_TRANSLITERATOR.transliterate(line, strip_markers,
+                                                       ignore_markers)
+                     for line in io.StringIO(text)])
+
+
+def _transliterate_file(text, strip_markers, ignore_markers):
+    fout = io.StringIO()
+    camel_transliterate._transliterate_file(TEST_TRANSLITERATOR, MARKER,
+                                            io.StringIO(text), fout,
+                                            strip_markers, ignore_markers)
+    return fout.getvalue()
+
+
+class TestTransliterateFile(object):
+    """Test class for transliterating input in blocks in camel_transliterate.
+    """
+
+    @pytest.mark.parametrize('block_size', [1, 2, 7, 16, 1024 * 1024])
+    @pytest.mark.parametrize('strip_markers', [False, True])
+    @pytest.mark.parametrize('ignore_markers', [False, True])
+    def test_transliterate_file(self, monkeypatch, block_size, strip_markers,
+                                ignore_markers):
+        """Test that transliterating in blocks gives the same output as
+        transliterating line by line, including lines split across blocks and
+        a last line with no trailing newline.
+        """
+
+        monkeypatch.setattr(camel_transliterate, '_BLOCK_SIZE', block_size)
+        text = u''.join(TEST_LINES)
+
+        assert (_transliterate_file(text, strip_markers, ignore_markers) ==
+                _transliterate_lines(text, strip_markers, ignore_markers))
+
+    @pytest.mark.parametrize('block_size', [1, 5, 1024 * 1024])
+    def test_transliterate_file_no_markers(self, monkeypatch, block_size):
+        """Test that input without markers is transliterated in blocks.
+        """
+
+        monkeypatch.setattr(camel_transliterate, '_BLOCK_SIZE', block_size)
+
+        assert _transliterate_file(u'ab c\nD\n\ne', False, False) == \
+            u'xx x\nX\n\nx'
+
+    def test_transliterate_file_empty(self):
+        """Test that empty input produces empty output.
+        """
+
+        assert _transliterate_file(u'', False, False) == u''
+
+    def test_transliterate_file_bare_marker(self, monkeypatch):
+        """Test that a bare marker starting a line in the middle of a block is
+        handled as when the line is transliterated on its own.
+        """
+
+        monkeypatch.setattr(camel_transliterate, '_BLOCK_SIZE', 1024)
+
+        assert _transliterate_file(u'ab\n@@IGNORE@@\n', False, False) == \
+            u'xx\n@@IGNORE@@\n'
@@ -258,6 +258,53 @@ class TestCharMapperMapString(object):
         mapper = CharMapper(VALID_MAP)
         assert mapper.map_string('٠١٢٣٤٥٦٧٨٩') == '012---++++'
 
+    def test_mapstring_default(self):
+        """Test that characters not in the charmap are mapped to the default.
+        """
+
+        mapper = CharMapper({'a': 'b'}, '_')
+        assert mapper.map_string('abc ١\U0001F600') == 'b_____'
+
+    def test_mapstring_default_none_value(self):
+        """Test that characters mapped to None are kept as is when a default is
+        set.
+        """
+
+        mapper = CharMapper({'a': None, 'x-z': None, 'b': 'B'}, '_')
+        assert mapper.map_string('abcyz') == 'aB_yz'
+
+    def test_mapstring_default_deletion(self):
+        """Test that an empty string value or default deletes characters.
+        """
+
+        mapper = CharMapper({'a': '', 'b': 'B'}, '-')
+        assert mapper.map_string('abc') == 'B-'
+
+        mapper = CharMapper({'a': 'A', 'b': None}, '')
+        assert mapper.map_string('abc') == 'Ab'
+
+    def test_mapstring_default_multichar(self):
+        """Test that multi-character values and defaults are inserted whole.
+        """
+
+        mapper = CharMapper({'a': 'xyz', '١': 'one'}, '<?>')
+        assert mapper.map_string('a١b') == 'xyzone<?>'
+
+    def test_mapstring_default_repeated(self):
+        """Test that mapping the same characters repeatedly with a default gives
+        the same result, and that characters remembered as unmapped by one
+        mapper do not affect another.
+        """
+
+        mapper = CharMapper({'a': 'A', 'b': None}, '_')
+        other = CharMapper({'c': 'C'}, '-')
+
+        for _ in range(3):
+            assert mapper.map_string('abcc') == 'Ab__'
+            assert other.map_string('abcc') == '--CC'
+
+        assert mapper.map_string('cab') == '_Ab'
+
 
 class TestCharMapperBuiltinMapper(object):
     """Test class for testing CharMapper's builtin_mapper method.
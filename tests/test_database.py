@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2024 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Tests for camel_tools.morphology.database
+"""
+
+from __future__ import absolute_import
+
+from types import SimpleNamespace
+
+import pytest
+
+from camel_tools.morphology import database
+from camel_tools.morphology.database import MorphologyDB
+from camel_tools.morphology.errors import DatabaseParseError
+
+
+# A tiny database with every section present. Stems, prefixes and suffixes use
+# ASCII so that the expected parse is easy to read.
+TEST_DB_SECTIONS = [
+    (u'###DEFINES###', [u'DEFINE pos pos:verb pos:noun',
+                        u'DEFINE per per:1 per:3 per:na',
+                        u'DEFINE diac diac:*open*',
+                        u'DEFINE lex lex:*open*',
+                        u'DEFINE d1tok d1tok:*open*']),
+    (u'###DEFAULTS###', [u'DEFAULT pos:verb per:na diac:* lex:* d1tok:*']),
+    (u'###ORDER###', [u'ORDER pos diac lex per d1tok']),
+    (u'###TOKENIZATIONS###', [u'TOKENIZATION d1tok']),
+    (u'###STEMBACKOFF###', [u'STEMBACKOFF ALL N']),
+    (u'###PREFIXES###', [u'\tPref-0\tdiac: d1tok:',
+                         u'w\tPref-Wa\tdiac:wa+ d1tok:wa+_']),
+    (u'###SUFFIXES###', [u'\tSuff-0\tdiac: d1tok:',
+                         u't\tSuff-t\tdiac:+tu per:1 d1tok:+tu']),
+    (u'###STEMS###', [u'ktb\tPV\tdiac:katab lex:katab-u_1 pos:verb per:3 '
+                      u'd1tok:katab',
+                      u'ktb\tN\tdiac:kutub lex:kitAb_1 pos:noun per:na '
+                      u'd1tok:kutub']),
+    (u'###TABLE AB###', [u'Pref-0 PV', u'Pref-Wa N']),
+    (u'###TABLE BC###', [u'PV Suff-t', u'N Suff-0']),
+    (u'###TABLE AC###', [u'Pref-0 Suff-t', u'Pref-Wa Suff-0']),
+]
+
+PREFIX_0 = {'diac': '', 'd1tok': ''}
+PREFIX_WA = {'diac': 'wa+', 'd1tok': 'wa+_'}
+SUFFIX_0 = {'diac': '', 'd1tok': ''}
+SUFFIX_T = {'diac': '+tu', 'per': '1', 'd1tok': '+tu'}
+STEM_PV = {'diac': 'katab', 'lex': 'katab', 'pos': 'verb', 'per': '3',
+           'd1tok': 'katab', 'stemcat': 'PV'}
+STEM_N = {'diac': 'kutub', 'lex': 'kitAb', 'pos': 'noun', 'per': 'na',
+          'd1tok': 'kutub', 'stemcat': 'N'}
+
+
+def _write_db(path, sections):
+    lines = []
+    for header, body in sections:
+        lines.append(header)
+        lines.extend(body)
+
+    path.write_text(u'\n'.join(lines) + u'\n', encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return _write_db(tmp_path / 'morphology.db', TEST_DB_SECTIONS)
+
+
+class TestMorphologyDBParse(object):
+    """Test class for parsing database files with MorphologyDB.
+    """
+
+    def test_parse_common_sections(self, db_path):
+        """Test that the sections used by all components are parsed the same
+        regardless of flags.
+        """
+
+        for flags in ('a', 'g', 'r'):
+            db = MorphologyDB(db_path, flags)
+
+            assert db.defines == {
+                'pos': frozenset(['verb', 'noun']),
+                'per': frozenset(['1', '3', 'na']),
+                'diac': None,
+                'lex': None,
+                'd1tok': None,
+            }
+            assert db.defaults == {
+                'verb': {'pos': 'verb', 'per': 'na', 'diac': None,
+                         'lex': None, 'd1tok': None}
+            }
+            assert db.order == ['pos', 'diac', 'lex', 'per', 'd1tok']
+            assert db.compute_feats == frozenset(db.order)
+            assert db.tokenizations == frozenset(['d1tok'])
+            assert db.stem_backoffs == {'ALL': ['N']}
+            assert db.stem_suffix_compat == {'PV': {'Suff-t'},
+                                             'N': {'Suff-0'}}
+            assert db.prefix_suffix_compat == {'Pref-0': {'Suff-t'},
+                                               'Pref-Wa': {'Suff-0'}}
+
+    def test_parse_analysis(self, db_path):
+        """Test that a database opened for analysis only builds the analysis
+        indexes.
+        """
+
+        db = MorphologyDB(db_path, 'a')
+
+        assert db.prefix_hash == {'': [('Pref-0', PREFIX_0)],
+                                  'w': [('Pref-Wa', PREFIX_WA)]}
+        assert db.suffix_hash == {'': [('Suff-0', SUFFIX_0)],
+                                  't': [('Suff-t', SUFFIX_T)]}
+        assert db.stem_hash == {'ktb': [('PV', STEM_PV), ('N', STEM_N)]}
+        assert db.prefix_stem_compat == {'Pref-0': {'PV'}, 'Pref-Wa': {'N'}}
+        assert db.max_prefix_size == 1
+        assert db.max_suffix_size == 1
+
+        assert db.prefix_cat_hash == {}
+        assert db.suffix_cat_hash == {}
+        assert db.lemma_hash == {}
+        assert db.stem_prefix_compat == {}
+
+    def test_parse_generation(self, db_path):
+        """Test that a database opened for generation only builds the
+        generation indexes.
+        """
+
+        db = MorphologyDB(db_path, 'g')
+
+        assert db.prefix_cat_hash == {'Pref-0': [PREFIX_0],
+                                      'Pref-Wa': [PREFIX_WA]}
+        assert db.suffix_cat_hash == {'Suff-0': [SUFFIX_0],
+                                      'Suff-t': [SUFFIX_T]}
+        assert db.lemma_hash == {'katab': [STEM_PV], 'kitAb': [STEM_N]}
+        assert db.stem_prefix_compat == {'PV': {'Pref-0'}, 'N': {'Pref-Wa'}}
+
+        assert db.prefix_hash == {}
+        assert db.suffix_hash == {}
+        assert db.stem_hash == {}
+        assert db.prefix_stem_compat == {}
+
+    def test_parse_reinflection(self, db_path):
+        """Test that a database opened for reinflection builds both the
+        analysis and generation indexes.
+        """
+
+        db = MorphologyDB(db_path, 'r')
+        db_a = MorphologyDB(db_path, 'a')
+        db_g = MorphologyDB(db_path, 'g')
+
+        assert db.prefix_hash == db_a.prefix_hash
+        assert db.suffix_hash == db_a.suffix_hash
+        assert db.stem_hash == db_a.stem_hash
+        assert db.prefix_stem_compat == db_a.prefix_stem_compat
+        assert db.prefix_cat_hash == db_g.prefix_cat_hash
+        assert db.suffix_cat_hash == db_g.suffix_cat_hash
+        assert db.lemma_hash == db_g.lemma_hash
+        assert db.stem_prefix_compat == db_g.stem_prefix_compat
+
+    def test_parse_without_defines_header(self, tmp_path):
+        """Test that the DEFINES header is optional.
+        """
+
+        db_file = tmp_path / 'morphology.db'
+        path = _write_db(db_file, TEST_DB_SECTIONS)
+        contents = db_file.read_text(encoding='utf-8')
+        db_file.write_text(contents.split(u'\n', 1)[1], encoding='utf-8')
+
+        db = MorphologyDB(path, 'a')
+
+        assert db.order == ['pos', 'diac', 'lex', 'per', 'd1tok']
+
+    def test_parse_sections_out_of_order(self, tmp_path):
+        """Test that a section header appearing out of order raises a
+        DatabaseParseError.
+        """
+
+        sections = list(TEST_DB_SECTIONS)
+        sections[1], sections[2] = sections[2], sections[1]
+        path = _write_db(tmp_path / 'morphology.db', sections)
+
+        with pytest.raises(DatabaseParseError):
+            MorphologyDB(path, 'a')
+
+    def test_parse_duplicate_section(self, tmp_path):
+        """Test that a repeated section header raises a DatabaseParseError.
+        """
+
+        sections = TEST_DB_SECTIONS[:5] + TEST_DB_SECTIONS[4:]
+        path = _write_db(tmp_path / 'morphology.db', sections)
+
+        with pytest.raises(DatabaseParseError):
+            MorphologyDB(path, 'a')
+
+    @pytest.mark.parametrize('missing', range(1, len(TEST_DB_SECTIONS)))
+    def test_parse_missing_section(self, tmp_path, missing):
+        """Test that a database missing a section raises a DatabaseParseError.
+        """
+
+        sections = TEST_DB_SECTIONS[:missing] + TEST_DB_SECTIONS[missing + 1:]
+        path = _write_db(tmp_path / 'morphology.db', sections)
+
+        with pytest.raises(DatabaseParseError):
+            MorphologyDB(path, 'a')
+
+
+class TestMorphologyDBBuiltin(object):
+    """Test class for MorphologyDB.builtin_db.
+    """
+
+    @pytest.fixture
+    def builtin(self, tmp_path, monkeypatch):
+        _write_db(tmp_path / 'morphology.db', TEST_DB_SECTIONS)
+
+        dataset = SimpleNamespace(path=str(tmp_path))
+        component = SimpleNamespace(default='test-db',
+                                    datasets={'test-db': dataset})
+        catalogue = SimpleNamespace(components={'MorphologyDB': component})
+        monkeypatch.setattr(database, 'CATALOGUE', catalogue)
+
+    def test_builtin_same_flags(self, builtin):
+        """Test that repeated calls with the same name and flags return the
+        same instance.
+        """
+
+        db = MorphologyDB.builtin_db('test-db', 'a')
+
+        assert MorphologyDB.builtin_db('test-db', 'a') is db
+        assert MorphologyDB.builtin_db(flags='a') is db
+
+    def test_builtin_equivalent_flags(self, builtin):
+        """Test that flag strings with the same flags in a different order
+        return the same instance.
+        """
+
+        db = MorphologyDB.builtin_db('test-db', 'ag')
+
+        assert MorphologyDB.builtin_db('test-db', 'ga') is db
+
+    def test_builtin_different_flags(self, builtin):
+        """Test that calls with different flags return different instances.
+        """
+
+        db_a = MorphologyDB.builtin_db('test-db', 'a')
+        db_g = MorphologyDB.builtin_db('test-db', 'g')
+
+        assert db_a is not db_g
+        assert db_a.flags.analysis and not db_a.flags.generation
+        assert db_g.flags.generation and not db_g.flags.analysis
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2024 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Tests for camel_tools.ner
+"""
+
+from __future__ import absolute_import
+
+import random
+
+import pytest
+import torch
+from transformers import BertConfig, BertForTokenClassification
+from transformers import BertTokenizer
+
+from camel_tools.ner import NERecognizer
+
+
+LABELS = ['B-LOC', 'B-ORG', 'B-PERS', 'B-MISC', 'I-LOC', 'I-ORG', 'I-PERS',
+          'I-MISC', 'O']
+
+CHARS = list(u'ابتثجحخدذرزسشصضطظعغفقكلمنهوي') + list(u'abcxyz0123.!?')
+VOCAB = ([u'[PAD]', u'[UNK]', u'[CLS]', u'[SEP]', u'[MASK]'] + CHARS +
+         [u'##' + c for c in CHARS] + [u'كتاب', u'محمد', u'في', u'مصر'])
+
+WORDS = [u'كتاب', u'محمد', u'في', u'مصر', u'الكتابين', u'abc', u'!', u'123',
+         u'xyz?', u'زيد']
+
+
+@pytest.fixture(scope='module')
+def ner(tmp_path_factory):
+    """A recognizer using a tiny randomly initialized BERT model.
+    """
+
+    model_path = tmp_path_factory.mktemp('ner_model')
+    vocab_path = model_path / 'vocab.txt'
+    vocab_path.write_text(u'\n'.join(VOCAB) + u'\n', encoding='utf-8')
+
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(VOCAB), hidden_size=32,
+                        num_hidden_layers=1, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64,
+                        id2label=dict(enumerate(LABELS)),
+                        label2id={l: i for i, l in enumerate(LABELS)})
+    BertForTokenClassification(config).save_pretrained(str(model_path))
+    BertTokenizer(str(vocab_path), do_lower_case=False).save_pretrained(
+        str(model_path))
+
+    return NERecognizer(str(model_path), use_gpu=False)
+
+
+@pytest.fixture(scope='module')
+def sentences():
+    """Sentences of varying lengths, including empty ones, a word that
+    tokenizes to nothing and a sentence longer than the model's maximum
+    sequence length used in the tests.
+    """
+
+    rand = random.Random(0)
+    sentences = [[rand.choice(WORDS) for _ in range(rand.randint(1, 12))]
+                 for _ in range(20)]
+    sentences[3] = []
+    sentences[7] = [u' ']
+    sentences[11] = []
+    sentences.append([rand.choice(WORDS) for _ in range(40)])
+
+    return sentences
+
+
+class TestNERecognizerPredictIter(object):
+    """Test class for NERecognizer.predict_iter.
+    """
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 7, 1024])
+    def test_predict_iter_chunks(self, ner, sentences, chunk_size):
+        """Test that predicting in chunks gives the same labels as predict.
+        """
+
+        expected = ner.predict(sentences, batch_size=4, max_seq_length=16)
+        predicted = ner.predict_iter(iter(sentences), batch_size=4,
+                                     max_seq_length=16, chunk_size=chunk_size)
+
+        assert list(predicted) == expected
+
+    def test_predict_iter_lengths(self, ner, sentences):
+        """Test that there's one label per word, except for words that
+        tokenize to nothing.
+        """
+
+        predicted = list(ner.predict_iter(sentences, max_seq_length=16,
+                                          chunk_size=5))
+
+        assert len(predicted) == len(sentences)
+        for sentence, labels in zip(sentences, predicted):
+            assert len(labels) == len([w for w in sentence if w.strip()])
+            assert all(label in LABELS for label in labels)
+
+    def test_predict_iter_empty(self, ner):
+        """Test that predicting an empty stream yields nothing.
+        """
+
+        assert list(ner.predict_iter(iter([]))) == []
+
+
+class TestNERecognizerPredictCompact(object):
+    """Test class for NERecognizer.predict_compact.
+    """
+
+    @pytest.mark.parametrize('chunk_size', [1, 4, 1024])
+    def test_predict_compact_round_trip(self, ner, sentences, chunk_size):
+        """Test that the compact labels split by offsets give the same labels
+        as predict.
+        """
+
+        expected = ner.predict(sentences, batch_size=4, max_seq_length=16)
+        label_ids, offsets, labels = ner.predict_compact(
+            sentences, batch_size=4, max_seq_length=16, chunk_size=chunk_size)
+
+        assert labels == LABELS
+        assert len(offsets) == len(sentences) + 1
+        assert offsets[0] == 0
+        assert offsets[-1] == len(label_ids)
+        assert [[labels[i] for i in label_ids[start:end]]
+                for start, end in zip(offsets[:-1], offsets[1:])] == expected
+
+    def test_predict_compact_empty_sentences(self, ner):
+        """Test that empty sentences get empty ranges of label ids.
+        """
+
+        label_ids, offsets, _ = ner.predict_compact([[], [u'كتاب'], [], []])
+
+        assert offsets.tolist() == [0, 0, 1, 1, 1]
+        assert len(label_ids) == 1
+
+    def test_predict_compact_empty(self, ner):
+        """Test that predicting no sentences gives empty arrays.
+        """
+
+        label_ids, offsets, labels = ner.predict_compact([])
+
+        assert len(label_ids) == 0
+        assert offsets.tolist() == [0]
+        assert labels == LABELS